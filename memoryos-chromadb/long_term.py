@@ -3,12 +3,15 @@ import numpy as np
 from typing import Optional, Dict, Any
 
 try:
-    from .utils import get_timestamp, get_embedding, normalize_vector, OpenAIClient, gpt_user_profile_analysis, gpt_knowledge_extraction
+    from .utils import get_timestamp, get_embedding, get_embeddings_batch, normalize_vector, normalize_vectors_batch, OpenAIClient, gpt_user_profile_analysis, gpt_knowledge_extraction
     from .storage_provider import ChromaStorageProvider
 except ImportError:
-    from utils import get_timestamp, get_embedding, normalize_vector, OpenAIClient, gpt_user_profile_analysis, gpt_knowledge_extraction
+    from utils import get_timestamp, get_embedding, get_embeddings_batch, normalize_vector, normalize_vectors_batch, OpenAIClient, gpt_user_profile_analysis, gpt_knowledge_extraction
     from storage_provider import ChromaStorageProvider
 
+# Placeholder values the LLM emits for empty knowledge lines
+_NONE_TOKENS = frozenset({"", "none", "- none", "- none."})
+
 class LongTermMemory:
     def __init__(self, 
                  storage_provider: ChromaStorageProvider, 
@@ -67,6 +70,44 @@ class LongTermMemory:
         
         self.storage.enforce_knowledge_capacity(knowledge_type, self.knowledge_capacity)
 
+    def _add_knowledge_many(self, lines: list, knowledge_type: str):
+        texts = []
+        for line in lines:
+            stripped = (line or "").strip()
+            if stripped and stripped.casefold() not in _NONE_TOKENS:
+                texts.append(stripped)
+
+        if not texts:
+            print(f"LongTermMemory: No valid {knowledge_type} knowledge lines to save.")
+            return
+
+        vectors = get_embeddings_batch(
+            texts,
+            model_name=self.embedding_model_name,
+            **self.embedding_model_kwargs
+        )
+        matrix = normalize_vectors_batch(vectors)
+        embeddings = [matrix[i].tolist() for i in range(len(texts))]
+
+        if knowledge_type == "user":
+            self.storage.add_user_knowledge_batch(texts, embeddings)
+        else:
+            self.storage.add_assistant_knowledge_batch(texts, embeddings)
+
+        self.storage.enforce_knowledge_capacity(knowledge_type, self.knowledge_capacity)
+        print(f"LongTermMemory: Added {len(texts)} {knowledge_type} knowledge entries in one batch.")
+
+    def add_user_knowledge_many(self, lines: list):
+        """
+        Adds many user knowledge entries with one batched embedding call and
+        one vector-store write, instead of one round-trip per line.
+        """
+        self._add_knowledge_many(lines, "user")
+
+    def add_assistant_knowledge_many(self, lines: list):
+        """Batch variant of add_knowledge for assistant knowledge entries."""
+        self._add_knowledge_many(lines, "assistant")
+
     def extract_knowledge_from_text(self, text: str) -> Optional[Dict[str, Any]]:
         """
         Uses an LLM to extract structured knowledge from a block of text.
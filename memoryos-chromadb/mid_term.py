@@ -7,17 +7,57 @@ from typing import Optional
 
 try:
     from .utils import (
-        get_timestamp, generate_id, get_embedding, normalize_vector, 
-        extract_keywords_from_multi_summary, compute_time_decay, ensure_directory_exists, OpenAIClient
+        get_timestamp, generate_id, get_embedding, normalize_vector,
+        extract_keywords_from_multi_summary, compute_time_decay, ensure_directory_exists, OpenAIClient,
+        quantize_vector_int8, int8_cosine
     )
     from .storage_provider import ChromaStorageProvider
 except ImportError:
     from utils import (
-        get_timestamp, generate_id, get_embedding, normalize_vector, 
-        extract_keywords_from_multi_summary, compute_time_decay, ensure_directory_exists, OpenAIClient
+        get_timestamp, generate_id, get_embedding, normalize_vector,
+        extract_keywords_from_multi_summary, compute_time_decay, ensure_directory_exists, OpenAIClient,
+        quantize_vector_int8, int8_cosine
     )
     from storage_provider import ChromaStorageProvider
 
+def _bfs_collect(start_idx, prev_arr, next_arr):
+    """
+    Collects all page indices reachable from start_idx through the pre/next link
+    arrays. Operates purely on int32 arrays so numba can jit it when available.
+    """
+    n = prev_arr.shape[0]
+    queue = np.empty(n, np.int32)
+    visited = np.zeros(n, np.uint8)
+    out = np.empty(n, np.int32)
+    head = 0
+    tail = 0
+    count = 0
+    queue[tail] = start_idx
+    tail += 1
+    visited[start_idx] = 1
+    while head < tail:
+        cur = queue[head]
+        head += 1
+        out[count] = cur
+        count += 1
+        prev_idx = prev_arr[cur]
+        if prev_idx >= 0 and visited[prev_idx] == 0:
+            visited[prev_idx] = 1
+            queue[tail] = prev_idx
+            tail += 1
+        next_idx = next_arr[cur]
+        if next_idx >= 0 and visited[next_idx] == 0:
+            visited[next_idx] = 1
+            queue[tail] = next_idx
+            tail += 1
+    return out[:count]
+
+try:
+    from numba import njit
+    _bfs_collect = njit(cache=True)(_bfs_collect)
+except ImportError:
+    pass  # numba is optional; the pure-NumPy version above is used as-is
+
 # Heat computation constants (can be tuned or made configurable)
 HEAT_ALPHA = 1.0
 HEAT_BETA = 1.0
@@ -42,8 +82,9 @@ class MidTermMemory:
                  user_id: str, 
                  client: OpenAIClient, 
                  max_capacity=2000,
-                 embedding_model_name: str = "all-MiniLM-L6-v2", 
-                 embedding_model_kwargs: Optional[dict] = None):
+                 embedding_model_name: str = "all-MiniLM-L6-v2",
+                 embedding_model_kwargs: Optional[dict] = None,
+                 use_int8_topic_similarity=True):
         self.user_id = user_id
         self.client = client
         self.max_capacity = max_capacity
@@ -58,10 +99,78 @@ class MidTermMemory:
         if not self.heap and self.sessions:
             self.rebuild_heap()
 
+        # id -> page hash-map over the session backups for O(1) lookups
+        self._page_index: dict = {}
+        # Dense int32 link arrays over the page graph, rebuilt lazily for BFS traversals
+        self._pid_to_idx: dict = {}
+        self._idx_to_pid: list = []
+        self._prev_arr = None
+        self._next_arr = None
+        self._link_arrays_dirty = True
+        self._rebuild_page_index()
+
+        # int8-quantized session summary embeddings for the topic-similarity path
+        # (in-memory only; sessions loaded from backup fall back to the store's score)
+        self.use_int8_topic_similarity = use_int8_topic_similarity
+        self._summary_emb_int8: dict = {}
+
         self.embedding_model_name = embedding_model_name
         self.embedding_model_kwargs = embedding_model_kwargs if embedding_model_kwargs is not None else {}
 
+    def _rebuild_page_index(self):
+        self._page_index = {
+            p["page_id"]: p
+            for session in self.sessions.values()
+            for p in session.get("pages_backup", [])
+            if p.get("page_id")
+        }
+        self._link_arrays_dirty = True
+
+    def _index_session_pages(self, session_id):
+        """(Re-)indexes the backup pages of one session after a storage write."""
+        for p in self.storage.get_pages_from_json_backup(session_id):
+            if p.get("page_id"):
+                self._page_index[p["page_id"]] = p
+        self._link_arrays_dirty = True
+
+    def invalidate_link_arrays(self):
+        """Marks the dense link arrays stale after pre/next links are edited in place."""
+        self._link_arrays_dirty = True
+
+    def _build_link_arrays(self):
+        self._pid_to_idx = {pid: idx for idx, pid in enumerate(self._page_index)}
+        self._idx_to_pid = list(self._page_index)
+        n = len(self._idx_to_pid)
+        self._prev_arr = np.full(n, -1, np.int32)
+        self._next_arr = np.full(n, -1, np.int32)
+        for pid, idx in self._pid_to_idx.items():
+            page = self._page_index[pid]
+            prev_id = page.get("pre_page")
+            if prev_id and prev_id in self._pid_to_idx:
+                self._prev_arr[idx] = self._pid_to_idx[prev_id]
+            next_id = page.get("next_page")
+            if next_id and next_id in self._pid_to_idx:
+                self._next_arr[idx] = self._pid_to_idx[next_id]
+        self._link_arrays_dirty = False
+
+    def collect_linked_page_ids(self, start_page_id):
+        """
+        Returns the ids of all pages reachable from start_page_id through
+        pre_page/next_page links, traversing the dense int32 link arrays
+        (numba-jitted when numba is installed).
+        """
+        if self._link_arrays_dirty:
+            self._build_link_arrays()
+        start_idx = self._pid_to_idx.get(start_page_id)
+        if start_idx is None:
+            return []
+        reachable = _bfs_collect(start_idx, self._prev_arr, self._next_arr)
+        return [self._idx_to_pid[i] for i in reachable]
+
     def get_page_by_id(self, page_id):
+        page = self._page_index.get(page_id)
+        if page is not None:
+            return page
         return self.storage.get_page_by_id(page_id)
 
     def update_page_connections(self, prev_page_id, next_page_id):
@@ -69,6 +178,7 @@ class MidTermMemory:
             self.storage.update_page_connections(prev_page_id, {"next_page": next_page_id})
         if next_page_id:
             self.storage.update_page_connections(next_page_id, {"pre_page": prev_page_id})
+        self._link_arrays_dirty = True
 
     def evict_lfu(self):
         if not self.access_frequency or not self.sessions:
@@ -88,6 +198,10 @@ class MidTermMemory:
         # Remove from local data structures
         session_to_delete = self.sessions.pop(lfu_sid)
         del self.access_frequency[lfu_sid]
+        self._summary_emb_int8.pop(lfu_sid, None)
+        for p in session_to_delete.get("pages_backup", []):
+            self._page_index.pop(p.get("page_id"), None)
+        self._link_arrays_dirty = True
 
         self.rebuild_heap()
         print(f"MidTermMemory: Evicted session {lfu_sid}.")
@@ -99,7 +213,9 @@ class MidTermMemory:
             model_name=self.embedding_model_name, 
             **self.embedding_model_kwargs
         )
-        summary_vec = normalize_vector(summary_vec).tolist()
+        summary_vec = normalize_vector(summary_vec)
+        self._summary_emb_int8[session_id] = quantize_vector_int8(summary_vec)
+        summary_vec = summary_vec.tolist()
         summary_keywords = list(extract_keywords_from_multi_summary(summary, client=self.client))
         
         processed_details = []
@@ -107,14 +223,13 @@ class MidTermMemory:
             page_id = page_data.get("page_id", generate_id("page"))
             
             # 检查是否已有embedding，避免重复计算
-            if "page_embedding" in page_data and page_data["page_embedding"]:
+            if page_data.get("page_embedding") is not None:
                 print(f"MidTermMemory: Reusing existing embedding for page {page_id}")
-                inp_vec = page_data["page_embedding"]
+                inp_vec = np.asarray(page_data["page_embedding"], dtype=np.float32)
                 # 确保embedding是normalized的
-                if isinstance(inp_vec, list):
-                    inp_vec_np = np.array(inp_vec, dtype=np.float32)
-                    if np.linalg.norm(inp_vec_np) > 1.1 or np.linalg.norm(inp_vec_np) < 0.9:  # 检查是否需要重新normalize
-                        inp_vec = normalize_vector(inp_vec_np).tolist()
+                norm = np.linalg.norm(inp_vec)
+                if norm > 1.1 or norm < 0.9:  # 检查是否需要重新normalize
+                    inp_vec = normalize_vector(inp_vec)
             else:
                 print(f"MidTermMemory: Computing new embedding for page {page_id}")
                 full_text = f"User: {page_data.get('user_input','')} Assistant: {page_data.get('agent_response','')}"
@@ -123,7 +238,7 @@ class MidTermMemory:
                     model_name=self.embedding_model_name,
                     **self.embedding_model_kwargs
                 )
-                inp_vec = normalize_vector(inp_vec).tolist()
+                inp_vec = normalize_vector(inp_vec)
             
             # 检查是否已有keywords，避免重复计算
             if "page_keywords" in page_data and page_data["page_keywords"]:
@@ -132,7 +247,7 @@ class MidTermMemory:
             else:
                 print(f"MidTermMemory: Computing new keywords for page {page_id}")
                 full_text = f"User: {page_data.get('user_input','')} Assistant: {page_data.get('agent_response','')}"
-                page_keywords = list(extract_keywords_from_multi_summary(full_text, client=self.client))
+                page_keywords = set(extract_keywords_from_multi_summary(full_text, client=self.client))
             
             processed_page = {
                 **page_data, # Carry over existing fields like user_input, agent_response, timestamp
@@ -164,9 +279,12 @@ class MidTermMemory:
         
         # Add to storage
         self.storage.add_mid_term_session(session_obj, processed_details)
-        
-        # Update local data structures
-        self.sessions[session_id] = session_obj
+
+        # Update local data structures. self.sessions aliases the storage metadata
+        # dict, so the backup written above is already registered under session_id;
+        # overwriting it with session_obj would drop pages_backup (breaking the page
+        # index) and leak the summary embedding into the JSON metadata.
+        self._index_session_pages(session_id)
         self.access_frequency[session_id] = 0 # Initialize for LFU
         heapq.heappush(self.heap, (-session_obj["H_segment"], session_id)) # Use negative heat for max-heap behavior
         
@@ -202,7 +320,9 @@ class MidTermMemory:
         
         # Search for similar sessions using ChromaDB
         similar_sessions = self.storage.search_mid_term_sessions(new_summary_vec.tolist(), top_k=5)
-        
+
+        new_summary_int8 = quantize_vector_int8(new_summary_vec) if self.use_int8_topic_similarity else None
+
         best_sid = None
         best_overall_score = -1
 
@@ -210,9 +330,15 @@ class MidTermMemory:
             session_id = session_result["session_id"]
             if session_id not in self.sessions:
                 continue
-                
+
             existing_session = self.sessions[session_id]
-            semantic_sim = session_result["session_relevance_score"]
+            # Re-score candidates with the int8 dot product when we hold a quantized
+            # summary vector; the coarse similarity threshold tolerates the quant error
+            existing_int8 = self._summary_emb_int8.get(session_id) if new_summary_int8 is not None else None
+            if existing_int8 is not None:
+                semantic_sim = int8_cosine(new_summary_int8, existing_int8)
+            else:
+                semantic_sim = session_result["session_relevance_score"]
             
             # Keyword similarity (Jaccard index based)
             existing_keywords = set(existing_session.get("summary_keywords", []))
@@ -243,13 +369,13 @@ class MidTermMemory:
             for page_data in pages_to_insert:
                 page_id = page_data.get("page_id", generate_id("page"))
                 
-                if "page_embedding" not in page_data or not page_data["page_embedding"]:
+                if page_data.get("page_embedding") is None:
                      full_text = f"User: {page_data.get('user_input','')} Assistant: {page_data.get('agent_response','')}"
-                     page_data["page_embedding"] = normalize_vector(get_embedding(full_text, model_name=self.embedding_model_name, **self.embedding_model_kwargs)).tolist()
+                     page_data["page_embedding"] = normalize_vector(get_embedding(full_text, model_name=self.embedding_model_name, **self.embedding_model_kwargs))
 
                 if "page_keywords" not in page_data or not page_data["page_keywords"]:
                     full_text = f"User: {page_data.get('user_input','')} Assistant: {page_data.get('agent_response','')}"
-                    page_data["page_keywords"] = list(extract_keywords_from_multi_summary(full_text, client=self.client))
+                    page_data["page_keywords"] = set(extract_keywords_from_multi_summary(full_text, client=self.client))
 
                 processed_new_pages.append({**page_data, "page_id": page_id})
 
@@ -264,7 +390,8 @@ class MidTermMemory:
             
             # 5. Add the updated session and the complete list of pages to storage
             self.storage.add_mid_term_session(target_session, all_pages_for_session)
-            
+            self._index_session_pages(best_sid)
+
             # Update local heap
             self.rebuild_heap()
             print(f"MidTermMemory: Merged {len(processed_new_pages)} new pages into session {best_sid}. Total pages now: {len(all_pages_for_session)}.")
@@ -213,6 +213,26 @@ CONTINUITY_CHECK_USER_PROMPT = ("Determine if these two conversation pages are c
                                 "Current Page:\nUser: {curr_user}\nAssistant: {curr_agent}\n\n"
                                 "Continuous?")
 
+# Prompt for analyzing continuity and meta info of a whole evicted batch in one call
+CONTINUITY_META_BATCH_SYSTEM_PROMPT = ("""You are a conversation analyzer. For each new page you must decide whether it is a true continuation of the page before it (no topic shift), and produce an updated meta-summary of the ongoing conversation chain.
+Output ONLY a JSON list, one object per page, in the same order as the pages:
+[{"continuous": true/false, "meta_info": "..."}, ...]""")
+CONTINUITY_META_BATCH_USER_PROMPT = ("""Analyze the following {num_pages} conversation pages in order.
+
+For each page:
+1. "continuous": true if the page directly continues the previous page (the page before it in this list, or the "Previous Page" for the first one) without a topic shift, otherwise false.
+2. "meta_info": a concise (1-2 sentences max) meta-summary of the conversation chain up to and including this page. If the page is continuous, update the running meta-summary; if not, start a fresh meta-summary from this page.
+
+Previous Page:
+{prev_dialogue}
+
+Previous Meta-summary: {last_meta}
+
+New Pages:
+{dialogues}
+
+Return ONLY the JSON list.""")
+
 # Prompt for generating meta info (from dynamic_update.py, _generate_meta_info)
 META_INFO_SYSTEM_PROMPT = ("""You are a conversation meta-summary updater. Your task is to:
 1. Preserve relevant context from previous meta-summary
@@ -38,6 +38,16 @@ class ShortTermMemory:
             return msg
         return None
 
+    def drain_until_not_full(self) -> list:
+        """Evicts all oldest QA pairs in one batch instead of looping pop_oldest."""
+        evicted = self.storage.drain_short_term(self.max_capacity)
+        # Keep local deque in sync
+        for _ in range(min(len(evicted), len(self.memory))):
+            self.memory.popleft()
+        if evicted:
+            print(f"ShortTermMemory: Evicted {len(evicted)} oldest QA pairs.")
+        return evicted
+
     def load(self):
         try:
             # Load from the shared storage provider
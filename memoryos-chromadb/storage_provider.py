@@ -1,5 +1,6 @@
 import chromadb
 import json
+import numpy as np
 import os
 from typing import List, Dict, Any, Optional
 from collections import defaultdict, deque
@@ -97,6 +98,16 @@ class ChromaStorageProvider:
     def is_short_term_full(self, max_capacity: int) -> bool:
         return len(self.metadata.get("short_term_memory", [])) >= max_capacity
 
+    def drain_short_term(self, max_capacity: int) -> List[dict]:
+        """Removes and returns the oldest entries in one slice until below capacity."""
+        memory_list = self.metadata.get("short_term_memory", [])
+        if len(memory_list) < max_capacity:
+            return []
+        evict_count = len(memory_list) - max_capacity + 1
+        evicted = memory_list[:evict_count]
+        self.metadata["short_term_memory"] = memory_list[evict_count:]
+        return evicted
+
     # ==================== MID TERM MEMORY ====================
     
     def add_mid_term_session(self, session_data: dict, pages: List[dict]):
@@ -130,7 +141,8 @@ class ChromaStorageProvider:
                 "pre_page": page.get("pre_page", ""),
                 "next_page": page.get("next_page", ""),
                 "meta_info": page.get("meta_info", ""),
-                "page_keywords": page.get("page_keywords", [])
+                # Keywords are kept as sets in flight; serialize to a sorted list for JSON
+                "page_keywords": sorted(page.get("page_keywords", []))
             })
         
         self.metadata["mid_term_sessions"][session_id] = session_backup
@@ -152,7 +164,8 @@ class ChromaStorageProvider:
         
         if pages:
             # First, filter pages to only include those with embeddings.
-            pages_with_embeddings = [p for p in pages if "page_embedding" in p and p["page_embedding"]]
+            # (Embeddings may be float32 ndarrays, so test presence rather than truthiness.)
+            pages_with_embeddings = [p for p in pages if p.get("page_embedding") is not None]
 
             if pages_with_embeddings:
                 page_embeddings = [p["page_embedding"] for p in pages_with_embeddings]
@@ -169,7 +182,14 @@ class ChromaStorageProvider:
                           f"Embeddings: {len(page_embeddings)}, Metadatas: {len(page_metadatas)}, IDs: {len(page_ids)}")
                     return 
 
-                self.mid_term_collection.add(embeddings=page_embeddings, metadatas=page_metadatas, ids=page_ids)
+                # chromadb 0.4.24 only normalizes a single top-level ndarray; a Python
+                # list of ndarray rows fails its embedding validation, so stack the
+                # rows into one 2-D float32 array at this boundary.
+                self.mid_term_collection.add(
+                    embeddings=np.asarray(page_embeddings, dtype=np.float32),
+                    metadatas=page_metadatas,
+                    ids=page_ids
+                )
     
     def search_mid_term_sessions(self, query_embedding: List[float], top_k: int = 5) -> List[dict]:
         try:
@@ -297,6 +317,18 @@ class ChromaStorageProvider:
     def add_assistant_knowledge(self, text: str, embedding: List[float]):
         metadata = {"type": "assistant_knowledge", "timestamp": get_timestamp(), "text": text}
         self._add_knowledge(self.assistant_knowledge_collection, text, embedding, metadata)
+
+    def _add_knowledge_batch(self, collection, texts: List[str], embeddings: List[List[float]], knowledge_type: str):
+        timestamp = get_timestamp()
+        metadatas = [self._safe_metadata({"type": knowledge_type, "timestamp": timestamp, "text": text}) for text in texts]
+        ids = [generate_id(text) for text in texts]
+        collection.add(embeddings=embeddings, metadatas=metadatas, ids=ids)
+
+    def add_user_knowledge_batch(self, texts: List[str], embeddings: List[List[float]]):
+        self._add_knowledge_batch(self.user_knowledge_collection, texts, embeddings, "user_knowledge")
+
+    def add_assistant_knowledge_batch(self, texts: List[str], embeddings: List[List[float]]):
+        self._add_knowledge_batch(self.assistant_knowledge_collection, texts, embeddings, "assistant_knowledge")
     
     def _search_knowledge(self, collection, query_embedding: List[float], top_k: int) -> List[dict]:
         try:
@@ -1,8 +1,8 @@
 try:
     from .utils import (
         generate_id, get_timestamp, 
-        gpt_generate_multi_summary, check_conversation_continuity, generate_page_meta_info, OpenAIClient,
-        extract_keywords_from_multi_summary, run_parallel_tasks, normalize_vector, get_embedding
+        gpt_generate_multi_summary, check_conversation_continuity, generate_page_meta_info, batch_analyze_continuity_and_meta, OpenAIClient,
+        extract_keywords_from_multi_summary, run_parallel_tasks, normalize_vectors_batch, get_embeddings_batch
     )
     from .short_term import ShortTermMemory
     from .mid_term import MidTermMemory
@@ -10,14 +10,32 @@ try:
 except ImportError:
     from utils import (
         generate_id, get_timestamp, 
-        gpt_generate_multi_summary, check_conversation_continuity, generate_page_meta_info, OpenAIClient,
-        extract_keywords_from_multi_summary, run_parallel_tasks, normalize_vector, get_embedding
+        gpt_generate_multi_summary, check_conversation_continuity, generate_page_meta_info, batch_analyze_continuity_and_meta, OpenAIClient,
+        extract_keywords_from_multi_summary, run_parallel_tasks, normalize_vectors_batch, get_embeddings_batch
     )
     from short_term import ShortTermMemory
     from mid_term import MidTermMemory
     from long_term import LongTermMemory
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import atexit
+import io
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("memoryos.updater")
+
+# Minimum batch text size (chars) worth segmenting with a multi-topic summary call
+CONDENSE_THRESHOLD = 2000
+
+# Placeholder values the LLM returns when a section has no content.
+# The longest token is 7 chars, so anything longer than 8 chars is real content
+# and can skip the strip/casefold entirely.
+_NONE_TOKENS = frozenset({"none", "- none", "- none.", ""})
+
+def _has_content(text):
+    return bool(text) and (len(text) > 8 or text.strip().casefold() not in _NONE_TOKENS)
 
 class Updater:
     def __init__(self, 
@@ -34,88 +52,167 @@ class Updater:
         self.topic_similarity_threshold = topic_similarity_threshold
         self.last_evicted_page_for_continuity = None
         self.llm_model = llm_model
+        # One warm worker pool shared by all I/O fanouts instead of a fresh pool per call
+        self._io_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="updater-io")
+        # Response caches so retries/re-runs over the same page pair skip the LLM round-trip
+        self._continuity_cache = {}
+        self._meta_cache = {}
+        # Content-addressed cache: identical (User, Assistant) text bypasses
+        # embedding + keyword extraction entirely (LRU, bounded)
+        self._emb_cache = OrderedDict()
+        self._emb_cache_hits = 0
+        atexit.register(self.close)
 
-    def _process_page_embedding_and_keywords(self, page_data):
-        """并行处理单个页面的embedding和keywords生成"""
-        page_id = page_data.get("page_id", generate_id("page"))
-        
-        # 检查是否已有embedding和keywords
-        if "page_embedding" in page_data and page_data["page_embedding"] and \
-           "page_keywords" in page_data and page_data["page_keywords"]:
-            print(f"Updater: Page {page_id} already has embedding and keywords, skipping computation")
-            return page_data
-        
-        full_text = f"User: {page_data.get('user_input','')} Assistant: {page_data.get('agent_response','')}"
-        
-        # 并行计算embedding和keywords（如果需要）
-        tasks = []
-        if not ("page_embedding" in page_data and page_data["page_embedding"]):
-            tasks.append(('embedding', lambda: get_embedding(full_text)))
-        
-        if not ("page_keywords" in page_data and page_data["page_keywords"]):
-            tasks.append(('keywords', lambda: extract_keywords_from_multi_summary(full_text, client=self.client)))
-        
-        if tasks:
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                futures = {executor.submit(task[1]): task[0] for task in tasks}
-                results = {}
-                
-                for future in as_completed(futures):
-                    task_type = futures[future]
-                    try:
-                        results[task_type] = future.result()
-                    except Exception as e:
-                        print(f"Error in {task_type} computation for page {page_id}: {e}")
-                        results[task_type] = None
-            
-            # 更新页面数据
-            if 'embedding' in results and results['embedding'] is not None:
-                page_data["page_embedding"] = normalize_vector(results['embedding']).tolist()
-            
-            if 'keywords' in results and results['keywords'] is not None:
-                page_data["page_keywords"] = list(results['keywords'])
-        
-        return page_data
+    def close(self):
+        self._io_executor.shutdown(wait=True)
+
+    @staticmethod
+    def _page_full_text(page_data):
+        """Returns the page's 'User: ... Assistant: ...' text, building and caching it once."""
+        full_text = page_data.get("_full_text")
+        if full_text is None:
+            full_text = f"User: {page_data.get('user_input','')} Assistant: {page_data.get('agent_response','')}"
+            page_data["_full_text"] = full_text
+        return full_text
+
+    def _process_pages_embedding_and_keywords_batch(self, pages):
+        """批量处理整批页面的embedding和keywords，单次模型调用代替逐页计算"""
+        # Content-addressed fast path: identical (User, Assistant) text reuses the
+        # cached embedding + keywords and skips model/LLM calls entirely
+        pending = []
+        for page in pages:
+            if page.get("page_embedding") is not None and page.get("page_keywords"):
+                continue
+            cache_key = hash(self._page_full_text(page))
+            cached = self._emb_cache.get(cache_key)
+            if cached is not None:
+                self._emb_cache.move_to_end(cache_key)
+                self._emb_cache_hits += 1
+                page["page_embedding"], cached_keywords = cached
+                page["page_keywords"] = set(cached_keywords)
+            else:
+                pending.append(page)
+
+        pages_needing_embedding = [p for p in pending if p.get("page_embedding") is None]
+        if pages_needing_embedding:
+            texts = [self._page_full_text(p) for p in pages_needing_embedding]
+            # Pages land in the mid-term collection, so embed with its configured model
+            vectors = get_embeddings_batch(
+                texts,
+                model_name=self.mid_term_memory.embedding_model_name,
+                **self.mid_term_memory.embedding_model_kwargs
+            )
+            computed = [(page, vec) for page, vec in zip(pages_needing_embedding, vectors) if vec is not None]
+            if computed:
+                # One L2-normalize over the whole (N, d) matrix instead of per page;
+                # pages keep their float32 row view, no per-page Python float lists
+                matrix = normalize_vectors_batch([vec for _, vec in computed])
+                for row, (page, _) in enumerate(computed):
+                    page["page_embedding"] = matrix[row]
+
+        pages_needing_keywords = [
+            p for p in pending if not ("page_keywords" in p and p["page_keywords"])
+        ]
+        if pages_needing_keywords:
+            asyncio.run(self._process_pages_async(pages_needing_keywords))
+
+        # Remember fully processed pages so identical text hits the cache next time
+        for page in pending:
+            if page.get("page_embedding") is not None and page.get("page_keywords"):
+                if len(self._emb_cache) >= self._EMB_CACHE_MAX:
+                    self._emb_cache.popitem(last=False)  # LRU eviction
+                self._emb_cache[hash(self._page_full_text(page))] = (
+                    page["page_embedding"], frozenset(page["page_keywords"])
+                )
+
+        return pages
+
+    async def _process_pages_async(self, pages, max_in_flight=8):
+        """在单个事件循环上并发处理整批页面的keywords，避免逐页创建线程池"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def _keywords_for(page):
+            async with semaphore:
+                full_text = self._page_full_text(page)
+                return await loop.run_in_executor(
+                    self._io_executor,
+                    lambda: extract_keywords_from_multi_summary(full_text, client=self.client)
+                )
+
+        tasks = [asyncio.create_task(_keywords_for(page)) for page in pages]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        for page, result in zip(pages, results):
+            if isinstance(result, Exception):
+                logger.error("Error in keywords computation for page %s: %s", page.get("page_id"), result)
+            elif result is not None:
+                page["page_keywords"] = set(result)
+        return pages
+
+    _RESPONSE_CACHE_MAX = 4096
+    _EMB_CACHE_MAX = 10000
+
+    def _cached_continuity(self, prev_page, curr_page):
+        """check_conversation_continuity with a response cache keyed on the page texts.
+
+        Page ids are freshly generated uuids on every eviction, so the key is
+        content-addressed (like the embedding cache) to let reprocessed or
+        duplicated text actually hit.
+        """
+        if not prev_page or not curr_page:
+            return False
+        key = (hash(self._page_full_text(prev_page)), hash(self._page_full_text(curr_page)))
+        hit = self._continuity_cache.get(key)
+        if hit is None:
+            hit = check_conversation_continuity(prev_page, curr_page, self.client, model=self.llm_model)
+            if len(self._continuity_cache) >= self._RESPONSE_CACHE_MAX:
+                self._continuity_cache.clear()
+            self._continuity_cache[key] = hit
+        return hit
+
+    def _cached_meta_info(self, prev_page, curr_page):
+        """generate_page_meta_info with a response cache keyed on its actual inputs
+        (previous meta_info + current page text); page ids are not stable across
+        evictions so they would never repeat."""
+        last_meta = prev_page.get("meta_info") if prev_page else None
+        key = (hash(last_meta) if last_meta else None,
+               hash(self._page_full_text(curr_page)))
+        hit = self._meta_cache.get(key)
+        if hit is None:
+            hit = generate_page_meta_info(last_meta, curr_page, self.client, model=self.llm_model)
+            if len(self._meta_cache) >= self._RESPONSE_CACHE_MAX:
+                self._meta_cache.clear()
+            self._meta_cache[key] = hit
+        return hit
 
-    def _update_linked_pages_meta_info(self, start_page_id, new_meta_info):
+    def _update_linked_pages_meta_info(self, start_page_id, new_meta_info, defer_save=False):
         """
         Updates meta_info for a chain of connected pages starting from start_page_id.
+        With defer_save=True, persistence is left to the caller (one save per batch
+        instead of one per chain).
         """
-        q = [start_page_id]
-        visited = {start_page_id}
-        
-        head = 0
-        while head < len(q):
-            current_page_id = q[head]
-            head += 1
-            page = self.mid_term_memory.get_page_by_id(current_page_id)
+        page_index = self.mid_term_memory._page_index
+        reachable_ids = self.mid_term_memory.collect_linked_page_ids(start_page_id)
+        for page_id in reachable_ids:
+            page = page_index.get(page_id)
             if page:
                 page["meta_info"] = new_meta_info
-                # Check previous page
-                prev_id = page.get("pre_page")
-                if prev_id and prev_id not in visited:
-                    q.append(prev_id)
-                    visited.add(prev_id)
-                # Check next page
-                next_id = page.get("next_page")
-                if next_id and next_id not in visited:
-                    q.append(next_id)
-                    visited.add(next_id)
-        if q:
+        if reachable_ids and not defer_save:
             self.mid_term_memory.save()
 
     def process_short_term_to_mid_term(self):
-        evicted_qas = []
-        while self.short_term_memory.is_full():
-            qa = self.short_term_memory.pop_oldest()
-            if qa and qa.get("user_input") and qa.get("agent_response"):
-                evicted_qas.append(qa)
-        
+        evicted_qas = [
+            qa for qa in self.short_term_memory.drain_until_not_full()
+            if qa and qa.get("user_input") and qa.get("agent_response")
+        ]
+
+
         if not evicted_qas:
-            print("Updater: No QAs evicted from short-term memory.")
+            logger.debug("Updater: No QAs evicted from short-term memory.")
             return
 
-        print(f"Updater: Processing {len(evicted_qas)} QAs from short-term to mid-term.")
+        logger.debug("Updater: Processing %d QAs from short-term to mid-term.", len(evicted_qas))
         
         # 1. Create page structures and handle continuity within the evicted batch
         current_batch_pages = []
@@ -133,24 +230,37 @@ class Updater:
                 "next_page": None,
                 "meta_info": None
             }
-            
-            is_continuous = check_conversation_continuity(temp_last_page_in_batch, current_page_obj, self.client, model=self.llm_model)
-            
-            if is_continuous and temp_last_page_in_batch:
+            current_batch_pages.append(current_page_obj)
+
+        # One LLM call for the whole batch instead of two calls per page
+        analysis_results = batch_analyze_continuity_and_meta(
+            temp_last_page_in_batch, current_batch_pages, self.client, model=self.llm_model
+        )
+
+        for current_page_obj, analysis in zip(current_batch_pages, analysis_results):
+            if analysis["meta_info"] is None:
+                # Batch result unparsable for this page; fall back to the per-page (cached) calls
+                is_continuous = self._cached_continuity(temp_last_page_in_batch, current_page_obj)
+            else:
+                is_continuous = analysis["continuous"] and temp_last_page_in_batch is not None
+
+            if is_continuous:
                 current_page_obj["pre_page"] = temp_last_page_in_batch["page_id"]
-                
-                # Meta info generation based on continuity
-                last_meta = temp_last_page_in_batch.get("meta_info")
-                new_meta = generate_page_meta_info(last_meta, current_page_obj, self.client, model=self.llm_model)
+
+                new_meta = analysis["meta_info"]
+                if new_meta is None:
+                    new_meta = self._cached_meta_info(temp_last_page_in_batch, current_page_obj)
                 current_page_obj["meta_info"] = new_meta
-                
-                if temp_last_page_in_batch.get("page_id") and self.mid_term_memory.get_page_by_id(temp_last_page_in_batch["page_id"]):
-                    self._update_linked_pages_meta_info(temp_last_page_in_batch["page_id"], new_meta)
+
+                if temp_last_page_in_batch.get("page_id") in self.mid_term_memory._page_index:
+                    self._update_linked_pages_meta_info(temp_last_page_in_batch["page_id"], new_meta, defer_save=True)
             else:
                 # Start of a new chain or no previous page
-                current_page_obj["meta_info"] = generate_page_meta_info(None, current_page_obj, self.client, model=self.llm_model)
-            
-            current_batch_pages.append(current_page_obj)
+                new_meta = analysis["meta_info"]
+                if new_meta is None:
+                    new_meta = self._cached_meta_info(None, current_page_obj)
+                current_page_obj["meta_info"] = new_meta
+
             temp_last_page_in_batch = current_page_obj
         
         # Update the global last evicted page for the next run of this method
@@ -160,21 +270,40 @@ class Updater:
         # 2. Consolidate text from current_batch_pages for multi-summary
         if not current_batch_pages:
             return
-            
-        input_text_for_summary = "\n".join([
-            f"User: {p.get('user_input','')}\nAssistant: {p.get('agent_response','')}" 
-            for p in current_batch_pages
-        ])
-        
-        print("Updater: Generating multi-topic summary for the evicted batch...")
-        multi_summary_result = gpt_generate_multi_summary(input_text_for_summary, self.client, model=self.llm_model)
+
+        # Pre-compute embeddings (one batched model call) and keywords for the whole
+        # evicted batch so MidTermMemory does not recompute them page by page.
+        self._process_pages_embedding_and_keywords_batch(current_batch_pages)
+
+
+        # Stream the summary input into one buffer instead of materializing an
+        # intermediate list of per-page strings before joining
+        buf = io.StringIO()
+        for i, p in enumerate(current_batch_pages):
+            if i:
+                buf.write("\n")
+            buf.write("User: ")
+            buf.write(p.get("user_input", ""))
+            buf.write("\nAssistant: ")
+            buf.write(p.get("agent_response", ""))
+        input_text_for_summary = buf.getvalue()
         
+        # Fast path: a batch of 1-2 pages (or very little text) has nothing to segment,
+        # so skip the most expensive LLM call and fall through to the general session branch.
+        total_chars = sum(len(self._page_full_text(p)) for p in current_batch_pages)
+        if len(current_batch_pages) <= 2 or total_chars < CONDENSE_THRESHOLD:
+            logger.debug("Updater: Batch too small to segment (%d pages, %d chars). Skipping multi-topic summary.", len(current_batch_pages), total_chars)
+            multi_summary_result = None
+        else:
+            logger.debug("Updater: Generating multi-topic summary for the evicted batch...")
+            multi_summary_result = gpt_generate_multi_summary(input_text_for_summary, self.client, model=self.llm_model)
+
         # 3. Insert pages into MidTermMemory based on summaries
         if multi_summary_result and multi_summary_result.get("summaries"):
             for summary_item in multi_summary_result["summaries"]:
                 theme_summary = summary_item.get("content", "General summary of recent interactions.")
                 theme_keywords = summary_item.get("keywords", [])
-                print(f"Updater: Processing theme '{summary_item.get('theme')}' for mid-term insertion.")
+                logger.debug("Updater: Processing theme '%s' for mid-term insertion.", summary_item.get("theme"))
                 
                 self.mid_term_memory.insert_pages_into_session(
                     summary_for_new_pages=theme_summary,
@@ -184,9 +313,25 @@ class Updater:
                 )
         else:
             # Fallback: if no summaries, add as one session
-            print("Updater: No specific themes from multi-summary. Adding batch as a general session.")
-            fallback_summary = "General conversation segment from short-term memory."
-            fallback_keywords = extract_keywords_from_multi_summary(input_text_for_summary, self.client, model=self.llm_model) if input_text_for_summary else []
+            logger.debug("Updater: No specific themes from multi-summary. Adding batch as a general session.")
+            # Reuse the already-computed per-page keywords instead of a second keyword-extraction call
+            page_keyword_sets = [p["page_keywords"] for p in current_batch_pages if p.get("page_keywords")]
+            if page_keyword_sets:
+                fallback_keywords = set().union(*page_keyword_sets)
+            elif input_text_for_summary:
+                fallback_keywords = extract_keywords_from_multi_summary(input_text_for_summary, self.client, model=self.llm_model)
+            else:
+                fallback_keywords = []
+            # The summary is what gets embedded for topic similarity, so derive it
+            # from the batch content — a constant string here would make every
+            # small batch score ~1.0 against the previous one and merge the whole
+            # mid-term store into a single session.
+            fallback_summary = current_batch_pages[-1].get("meta_info")
+            if not _has_content(fallback_summary):
+                if fallback_keywords:
+                    fallback_summary = "Conversation segment about: " + ", ".join(sorted(fallback_keywords))
+                else:
+                    fallback_summary = "General conversation segment from short-term memory."
             self.mid_term_memory.insert_pages_into_session(
                 summary_for_new_pages=fallback_summary,
                 keywords_for_new_pages=list(fallback_keywords),
@@ -194,13 +339,25 @@ class Updater:
                 similarity_threshold=self.topic_similarity_threshold
             )
         
-        # After pages are in mid-term, ensure their connections are doubly linked
+        # _full_text is a transient per-batch cache; drop it before pages settle in storage
         for page in current_batch_pages:
-            if page.get("pre_page"):
-                self.mid_term_memory.update_page_connections(page["pre_page"], page["page_id"])
-            if page.get("next_page"):
-                self.mid_term_memory.update_page_connections(page["page_id"], page["next_page"])
+            page.pop("_full_text", None)
+
+        # After pages are in mid-term, stitch the chain doubly-linked in one pass
+        # over the page index instead of two storage-backed calls per page.
+        page_index = self.mid_term_memory._page_index
+        for page in current_batch_pages:
+            prev_id = page.get("pre_page")
+            if not prev_id:
+                continue  # continuity was broken before this page
+            stored_prev = page_index.get(prev_id)
+            stored_curr = page_index.get(page["page_id"])
+            if stored_prev is not None:
+                stored_prev["next_page"] = page["page_id"]
+            if stored_curr is not None:
+                stored_curr["pre_page"] = prev_id
         if current_batch_pages:
+            self.mid_term_memory.invalidate_link_arrays()
             self.mid_term_memory.save()
 
     def update_long_term_from_analysis(self, user_id, profile_analysis_result):
@@ -208,24 +365,29 @@ class Updater:
         Updates long-term memory based on the results of a personality/knowledge analysis.
         """
         if not profile_analysis_result:
-            print("Updater: No analysis result provided for long-term update.")
+            logger.debug("Updater: No analysis result provided for long-term update.")
             return
 
+        # The three branches touch disjoint state and are all I/O-bound on the
+        # vector store, so run whichever ones fire in parallel
+        tasks = []
+
         new_profile_text = profile_analysis_result.get("profile")
-        if new_profile_text and new_profile_text.lower() != "none":
-            print(f"Updater: Updating user profile for {user_id} in LongTermMemory.")
-            self.long_term_memory.update_user_profile(user_id, new_profile_text, merge=False)
-        
+        if _has_content(new_profile_text):
+            logger.debug("Updater: Updating user profile for %s in LongTermMemory.", user_id)
+            tasks.append(lambda: self.long_term_memory.update_user_profile(user_id, new_profile_text))
+
         user_private_knowledge = profile_analysis_result.get("private")
-        if user_private_knowledge and user_private_knowledge.lower() != "none":
-            print(f"Updater: Adding user private knowledge for {user_id} to LongTermMemory.")
-            for line in user_private_knowledge.split('\n'):
-                if line.strip() and line.strip().lower() not in ["none", "- none", "- none."]:
-                    self.long_term_memory.add_user_knowledge(line.strip()) 
+        if _has_content(user_private_knowledge):
+            logger.debug("Updater: Adding user private knowledge for %s to LongTermMemory.", user_id)
+            user_lines = user_private_knowledge.split('\n')
+            tasks.append(lambda: self.long_term_memory.add_user_knowledge_many(user_lines))
 
         assistant_knowledge_text = profile_analysis_result.get("assistant_knowledge")
-        if assistant_knowledge_text and assistant_knowledge_text.lower() != "none":
-            print("Updater: Adding assistant knowledge to LongTermMemory.")
-            for line in assistant_knowledge_text.split('\n'):
-                if line.strip() and line.strip().lower() not in ["none", "- none", "- none."]:
-                    self.long_term_memory.add_assistant_knowledge(line.strip())
\ No newline at end of file
+        if _has_content(assistant_knowledge_text):
+            logger.debug("Updater: Adding assistant knowledge to LongTermMemory.")
+            assistant_lines = assistant_knowledge_text.split('\n')
+            tasks.append(lambda: self.long_term_memory.add_assistant_knowledge_many(assistant_lines))
+
+        if tasks:
+            run_parallel_tasks(tasks)
\ No newline at end of file
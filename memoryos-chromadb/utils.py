@@ -105,14 +105,7 @@ def _get_valid_kwargs(func, kwargs):
     except (ValueError, TypeError):
         return kwargs
 
-def get_embedding(text, model_name="all-MiniLM-L6-v2", use_cache=True, **kwargs):
-    model_config_key = json.dumps({"model_name": model_name, **kwargs}, sort_keys=True)
-    
-    if use_cache:
-        cache_key = f"{model_config_key}::{hash(text)}"
-        if cache_key in _embedding_cache:
-            return _embedding_cache[cache_key]
-    
+def _get_cached_model(model_name, kwargs):
     model_init_key = json.dumps({"model_name": model_name, **{k:v for k,v in kwargs.items() if k not in ['batch_size', 'max_length']}}, sort_keys=True)
     if model_init_key not in _model_cache:
         print(f"Loading model: {model_name}...")
@@ -127,9 +120,18 @@ def get_embedding(text, model_name="all-MiniLM-L6-v2", use_cache=True, **kwargs)
             from sentence_transformers import SentenceTransformer
             init_kwargs = _get_valid_kwargs(SentenceTransformer.__init__, kwargs)
             _model_cache[model_init_key] = SentenceTransformer(model_name, **init_kwargs)
-            
-    model = _model_cache[model_init_key]
-    
+    return _model_cache[model_init_key]
+
+def get_embedding(text, model_name="all-MiniLM-L6-v2", use_cache=True, **kwargs):
+    model_config_key = json.dumps({"model_name": model_name, **kwargs}, sort_keys=True)
+
+    if use_cache:
+        cache_key = f"{model_config_key}::{hash(text)}"
+        if cache_key in _embedding_cache:
+            return _embedding_cache[cache_key]
+
+    model = _get_cached_model(model_name, kwargs)
+
     embedding = None
     if 'bge-m3' in model_name.lower():
         encode_kwargs = _get_valid_kwargs(model.encode, kwargs)
@@ -142,14 +144,82 @@ def get_embedding(text, model_name="all-MiniLM-L6-v2", use_cache=True, **kwargs)
     if use_cache:
         cache_key = f"{model_config_key}::{hash(text)}"
         _embedding_cache[cache_key] = embedding
-    
+
     return embedding
 
+def get_embeddings_batch(texts, model_name="all-MiniLM-L6-v2", use_cache=True, max_batch_size=2048, **kwargs):
+    """
+    Embed a list of texts in one model call instead of one call per text.
+    Returns embeddings in the same order as the input texts.
+    """
+    if not texts:
+        return []
+
+    model_config_key = json.dumps({"model_name": model_name, **kwargs}, sort_keys=True)
+
+    embeddings = [None] * len(texts)
+    missing_indices = []
+    if use_cache:
+        for i, text in enumerate(texts):
+            cached = _embedding_cache.get(f"{model_config_key}::{hash(text)}")
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing_indices.append(i)
+    else:
+        missing_indices = list(range(len(texts)))
+
+    if missing_indices:
+        model = _get_cached_model(model_name, kwargs)
+        encode_kwargs = _get_valid_kwargs(model.encode, kwargs)
+
+        # Sort longest-first so each internal batch pads to similar lengths
+        missing_indices.sort(key=lambda i: len(texts[i]), reverse=True)
+
+        for start in range(0, len(missing_indices), max_batch_size):
+            chunk = missing_indices[start:start + max_batch_size]
+            chunk_texts = [texts[i] for i in chunk]
+            if 'bge-m3' in model_name.lower():
+                result = model.encode(chunk_texts, **encode_kwargs)
+                vectors = result['dense_vecs']
+            else:
+                vectors = model.encode(chunk_texts, **encode_kwargs)
+
+            for i, vec in zip(chunk, vectors):
+                embeddings[i] = vec
+                if use_cache:
+                    _embedding_cache[f"{model_config_key}::{hash(texts[i])}"] = vec
+
+    return embeddings
+
 def normalize_vector(vec):
     vec = np.array(vec, dtype=np.float32)
     norm = np.linalg.norm(vec)
     return vec / norm if norm != 0 else vec
 
+def normalize_vectors_batch(vectors):
+    """
+    L2-normalize a batch of vectors as one (N, d) float32 matrix operation
+    instead of normalizing them one by one in Python.
+    """
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))[:, None]
+    matrix /= np.maximum(norms, 1e-12)
+    return matrix
+
+def quantize_vector_int8(vec):
+    """
+    Quantizes an L2-normalized vector to int8 in [-127, 127].
+    Halves memory twice over vs FP32 and keeps the dot product on integer ALUs.
+    """
+    return np.round(np.asarray(vec, dtype=np.float32) * 127.0).astype(np.int8)
+
+def int8_cosine(q1, q2):
+    """Approximate cosine similarity between two int8-quantized normalized vectors."""
+    return float(np.dot(q1.astype(np.int32), q2.astype(np.int32))) / (127.0 * 127.0)
+
 # ---- Time Decay Function ----
 def compute_time_decay(event_timestamp_str, current_timestamp_str, tau_hours=24):
     from datetime import datetime
@@ -288,6 +358,79 @@ def check_conversation_continuity(previous_page, current_page, client: OpenAICli
     response = client.chat_completion(model, messages, temperature=0.0)
     return response.lower() == 'true'
 
+def batch_analyze_continuity_and_meta(prev_page, new_pages, client: OpenAIClient, model="gpt-4o-mini", chunk_size=32, max_workers=4):
+    """
+    Analyze conversation continuity and meta-info for a whole batch of pages with a
+    single LLM call (per chunk of chunk_size) instead of two calls per page.
+    Returns a list of {"continuous": bool, "meta_info": str or None}, one per page.
+    """
+    if not new_pages:
+        return []
+
+    def _analyze_chunk(chunk_prev, chunk_pages):
+        last_meta = (chunk_prev or {}).get("meta_info") or "This is the beginning of the conversation."
+        prev_dialogue = "None"
+        if chunk_prev:
+            prev_dialogue = f"User: {chunk_prev.get('user_input', '')}\nAssistant: {chunk_prev.get('agent_response', '')}"
+        dialogues = "\n\n".join(
+            f"[Page {i+1}]\nUser: {p.get('user_input', '')}\nAssistant: {p.get('agent_response', '')}"
+            for i, p in enumerate(chunk_pages)
+        )
+        prompt = prompts.CONTINUITY_META_BATCH_USER_PROMPT.format(
+            num_pages=len(chunk_pages),
+            prev_dialogue=prev_dialogue,
+            last_meta=last_meta,
+            dialogues=dialogues
+        )
+        messages = [
+            {"role": "system", "content": prompts.CONTINUITY_META_BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        response_text = client.chat_completion(model, messages, temperature=0.0)
+        try:
+            parsed = json.loads(response_text)
+        except json.JSONDecodeError:
+            print(f"Warning: Could not parse batch continuity/meta JSON: {response_text}")
+            parsed = []
+        if not isinstance(parsed, list):
+            # Model wrapped the list in an object (or returned a scalar); fall back
+            # to per-page analysis rather than indexing into the wrong shape
+            print(f"Warning: Batch continuity/meta JSON is not a list: {response_text}")
+            parsed = []
+
+        chunk_results = []
+        for i in range(len(chunk_pages)):
+            item = parsed[i] if i < len(parsed) and isinstance(parsed[i], dict) else {}
+            chunk_results.append({
+                "continuous": bool(item.get("continuous", False)),
+                "meta_info": item.get("meta_info") or None
+            })
+        return chunk_results
+
+    # Split into chunks; each chunk's "previous page" is the last page of the chunk before it
+    chunks = []
+    chunk_prev = prev_page
+    for start in range(0, len(new_pages), chunk_size):
+        chunk_pages = new_pages[start:start + chunk_size]
+        chunks.append((chunk_prev, chunk_pages))
+        chunk_prev = chunk_pages[-1]
+
+    if len(chunks) == 1:
+        return _analyze_chunk(*chunks[0])
+
+    chunk_results = [None] * len(chunks)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_analyze_chunk, cp, cpg): idx for idx, (cp, cpg) in enumerate(chunks)}
+        for future in as_completed(futures):
+            idx = futures[future]
+            try:
+                chunk_results[idx] = future.result()
+            except Exception as e:
+                print(f"Error in batch continuity/meta analysis chunk {idx}: {e}")
+                chunk_results[idx] = [{"continuous": False, "meta_info": None}] * len(chunks[idx][1])
+
+    return [item for results in chunk_results for item in results]
+
 def generate_page_meta_info(last_page_meta, current_page, client: OpenAIClient, model="gpt-4o-mini"):
     new_dialogue = f"User: {current_page.get('user_input', '')}\nAssistant: {current_page.get('agent_response', '')}"
     